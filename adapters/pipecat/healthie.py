@@ -10,27 +10,10 @@ from typing import Any
 
 from integration import healthie
 from pipecat.services.llm_service import FunctionCallParams
-from utils.date_helpers import convert_to_datetime
+from utils.date_helpers import convert_to_datetime, parse_flexible_date
 from loguru import logger
 
 
-
-DATE_INPUT_FORMATS = ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y")
-
-
-def _parse_flexible_date(value: str) -> datetime:
-    trimmed = value.strip()
-    last_error: Exception | None = None
-    for fmt in DATE_INPUT_FORMATS:
-        try:
-            return datetime.strptime(trimmed, fmt)
-        except ValueError as exc:  # noqa: BLE001
-            last_error = exc
-    raise ValueError(
-        f"Date '{value}' must match one of the formats: {', '.join(DATE_INPUT_FORMATS)}"
-    ) from last_error
-
-
 def _build_error_payload(message: str, code: str | None = None) -> dict[str, Any]:
     payload: dict[str, Any] = {"success": False, "error": message}
     if code:
@@ -42,7 +25,7 @@ async def _respond_with_error(params: FunctionCallParams, message: str, code: st
     await params.result_callback(_build_error_payload(message, code))
 
 
-@dataclass
+@dataclass(slots=True)
 class PatientAppointmentRequest:
     patient_name: str
     patient_date_of_birth: str
@@ -55,7 +38,7 @@ class PatientAppointmentRequest:
             raise ValueError("Patient name cannot be empty.")
 
     def normalized_dob(self) -> str:
-        return _parse_flexible_date(self.patient_date_of_birth).strftime("%Y-%m-%d")
+        return parse_flexible_date(self.patient_date_of_birth).strftime("%Y-%m-%d")
 
     def appointment_datetime(self) -> datetime:
         return convert_to_datetime(
@@ -63,14 +46,14 @@ class PatientAppointmentRequest:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FindPatientRequest:
     """Request to find a patient in Healthie by name and date of birth."""
     patient_name: str
     patient_date_of_birth: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CreateAppointmentRequest:
     patient_id: str
     appointment_date_iso: str
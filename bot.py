@@ -18,6 +18,7 @@ Run the bot using::
     uv run bot.py
 """
 
+import asyncio
 import os
 
 from dotenv import load_dotenv
@@ -61,6 +62,7 @@ from pipecat.turns.user_turn_strategies import UserTurnStrategies
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
 
 from adapters.pipecat.healthie import find_patient_direct, create_appointment_direct
+from integration.healthie import prewarm_healthie
 
 logger.info("✅ All components loaded successfully!")
 
@@ -70,6 +72,9 @@ load_dotenv(override=True)
 async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
     logger.info(f"Starting bot")
 
+    # Log into Healthie while the user is still being greeted
+    warmup_task = asyncio.create_task(prewarm_healthie())
+
     elevenlabs_key = os.environ["ELEVENLABS_API_KEY"]
     stt = ElevenLabsRealtimeSTTService(api_key=elevenlabs_key)
     tts = ElevenLabsTTSService(
@@ -148,6 +153,7 @@ async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
     runner = PipelineRunner(handle_sigint=runner_args.handle_sigint)
 
     await runner.run(task)
+    await warmup_task
 
 
 async def bot(runner_args: RunnerArguments):
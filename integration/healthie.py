@@ -4,15 +4,25 @@ This module provides functions to interact with Healthie for patient management
 and appointment scheduling.
 """
 
+import json
 import os
 import re
+import threading
 import time
+from collections.abc import Awaitable
+from urllib.parse import urlparse
+
 from playwright.async_api import (
     Browser,
+    BrowserContext,
+    Error as PlaywrightError,
+    Frame,
     Page,
     Playwright,
+    Response,
     TimeoutError,
     async_playwright,
+    expect,
 )
 from loguru import logger
 from datetime import datetime
@@ -20,8 +30,6 @@ from datetime import datetime
 from utils.get_verification_code import get_otp
 from utils.playwright_helpers import (
     _wait_for_test_id,
-    get_value_by_label,
-    get_text,
     ensure_section_open,
 )
 
@@ -30,15 +38,240 @@ from utils.date_helpers import (
     convert_to_datetime,
     format_target_date,
     format_appointment_label,
+    parse_flexible_date,
 )
 
 import asyncio 
-_browser: Browser | None = None
+_cdp_browser: Browser | None = None
+_context: BrowserContext | None = None
 _page: Page | None = None
+_session_valid = False
 _playwright: Playwright | None = None
+_keepalive_task: asyncio.Task | None = None
+_warmup_future: asyncio.Future | None = None
+_login_lock = asyncio.Lock()
+# Every public call drives the one shared tab, so each holds this for its whole
+# run. Take it before _login_lock, never while holding it.
+_page_lock = asyncio.Lock()
+_patient_cache: dict[tuple[str, str], tuple[float, dict]] = {}
+_last_opened_patient: dict[str, tuple[float, str]] = {}
+_lookup_channel: asyncio.Queue[tuple[str, str, asyncio.Future]] | None = None
+_lookup_worker: asyncio.Task | None = None
 
 DEFAULT_WAIT_TIME = 10000
-MAX_WAIT_TIME = 30_000
+MAX_WAIT_TIME = 20_000
+# The OTP screen can take longer to appear than a regular UI element
+OTP_SCREEN_TIMEOUT = 30_000
+OTP_TIMEOUT = 20
+FLASH_MESSAGE_TIMEOUT = 1500
+SESSION_CHECK_TIMEOUT = 500
+SEARCH_REFRESH_TIMEOUT = 2_000
+KEEPALIVE_INTERVAL = 5 * 60
+PATIENT_CACHE_TTL = 5 * 60
+PATIENT_CACHE_MAX_ENTRIES = 128
+LOOKUP_BATCH_SIZE = 8
+OPENED_PROFILE_TTL = 60
+
+HEALTHIE_URL = "https://secure.gethealthie.com"
+PROFILE_DIR = os.environ.get(
+    "HEALTHIE_PROFILE_DIR", os.path.expanduser("~/.cache/prosper/healthie-profile")
+)
+DISK_CACHE_SIZE = 512 * 1024 * 1024
+CDP_URL = os.environ.get("HEALTHIE_CDP_URL")
+STORAGE_STATE_PATH = os.environ.get("HEALTHIE_STORAGE_STATE", ".auth/healthie.json")
+STORAGE_STATE_MAX_AGE = 12 * 60 * 60
+# HEADED=1 is a quick override for local debugging sessions
+HEADLESS = (
+    os.environ.get("HEALTHIE_HEADLESS", "1") == "1" and os.environ.get("HEADED") != "1"
+)
+# Images are switched off in Blink rather than aborted through page.route():
+# request interception disables Chromium's HTTP cache and sends every request
+# through Python.
+BROWSER_ARGS = [
+    f"--disk-cache-size={DISK_CACHE_SIZE}",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+
+# Selectors are parsed once here instead of being rebuilt on every call.
+SEL_EMAIL_INPUT = 'input[name="identifier"], [data-test-id="input-identifier"]'
+SEL_PASSWORD_INPUT = 'input[name="password"]'
+SEL_LOGIN_BUTTON = 'button:has-text("Log In")'
+SEL_PASSKEYS_CONTINUE = '[data-test-id="passkeys-continue-to-app"]'
+SEL_OTP_INPUT = 'div[data-test-id="otc-input-{index}"] input'
+# Fills every OTP box in one round trip. The native value setter is used so
+# React's onChange still sees the input events.
+FILL_OTP_SCRIPT = """([code, selector]) => {
+    const setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+    [...code].forEach((digit, index) => {
+        const input = document.querySelector(selector.replace("{index}", index));
+        if (!input) {
+            throw new Error(`missing OTP box ${index}`);
+        }
+        setValue.call(input, digit);
+        input.dispatchEvent(new Event("input", { bubbles: true }));
+    });
+}"""
+SEL_RESULTS_CONTAINER = "#quick-profile-user-list-target"
+SEL_SIDEBAR_EMAIL = ".sidebar-email"
+SEL_APPOINTMENT_MODAL = (
+    "div[data-test-id='appointment-modal-body'], div._asideModalBody_bk67x_39"
+)
+# Match the react-select control by its stable "-control" suffix rather than
+# the emotion hash, which changes with every Healthie deploy.
+SEL_APPT_TYPE_DROPDOWN = ".appointment_type_id [class*='-control']"
+SEL_TIME_LIST_ITEM = "li.react-datepicker__time-list-item"
+DATE_PICKER_INPUT_FORMAT = "%m/%d/%Y"
+CONFLICT_RE = re.compile(
+    r"another event scheduled|already have an appointment|conflicts with", re.IGNORECASE
+)
+NO_RESULTS_TEXT = "No results match your search"
+
+# Reads every field of the client-basic-info panel, plus the sidebar email, in
+# one round trip. Labelled rows are indexed once by their leaf label nodes, so
+# each field is a map lookup; the value is the last div of the label's row.
+BASIC_INFO_SCRIPT = """(node, emailSelector) => {
+    const byTestId = id => node.querySelector(`[data-test-id="${id}"]`)?.innerText?.trim() ?? null;
+    const rowsByLabel = new Map();
+    for (const leaf of node.querySelectorAll("div.row :not(:has(*))")) {
+        const text = leaf.textContent.trim();
+        if (text && !rowsByLabel.has(text)) {
+            rowsByLabel.set(text, leaf.closest("div.row"));
+        }
+    }
+    const byLabel = label => {
+        const divs = rowsByLabel.get(label)?.querySelectorAll("div");
+        return divs?.length ? divs[divs.length - 1].innerText : null;
+    };
+    return {
+        unique_id: byTestId("unique-client-id"),
+        client_since: byTestId("client-since"),
+        dob: byTestId("client-dob"),
+        phone: byLabel("Phone number"),
+        group: byLabel("Group"),
+        timezone: byLabel("Timezone"),
+        location: byLabel("Location"),
+        fitbit: byLabel("Last Fitbit sync"),
+        email: document.querySelector(emailSelector)?.textContent ?? null,
+    };
+}"""
+
+
+async def _session_is_valid(page: Page) -> bool:
+    """Return True if the page is still open and shows the authenticated navigation."""
+    if page.is_closed():
+        return False
+    try:
+        await page.get_by_role("link", name="Clients").wait_for(
+            state="visible", timeout=SESSION_CHECK_TIMEOUT
+        )
+    except TimeoutError:
+        return False
+    return True
+
+
+async def _keep_session_alive() -> None:
+    """Periodically touch the Healthie session so the page stays warm between calls."""
+    while True:
+        await asyncio.sleep(KEEPALIVE_INTERVAL)
+        async with _page_lock:
+            if _page is None or _page.is_closed():
+                return
+            try:
+                await _page.evaluate(
+                    "url => fetch(url, {method: 'HEAD', credentials: 'include'})", HEALTHIE_URL
+                )
+            except Exception as exc:
+                logger.warning("Healthie keep-alive ping failed: {}", exc)
+
+
+async def _restore_saved_cookies(context: BrowserContext) -> None:
+    """Seed a fresh profile with the cookies of the last login if they are recent enough."""
+    try:
+        if time.time() - os.path.getmtime(STORAGE_STATE_PATH) > STORAGE_STATE_MAX_AGE:
+            return
+        with open(STORAGE_STATE_PATH) as state_file:
+            cookies = json.load(state_file).get("cookies", [])
+    except (OSError, ValueError):
+        return
+    if cookies:
+        await context.add_cookies(cookies)
+
+
+async def _save_storage_state(context: BrowserContext) -> None:
+    """Export the authenticated cookies so a wiped profile can skip the OTP step."""
+    try:
+        os.makedirs(os.path.dirname(STORAGE_STATE_PATH) or ".", exist_ok=True)
+        await context.storage_state(path=STORAGE_STATE_PATH)
+    except OSError as exc:
+        logger.warning("Could not save Healthie storage state: {}", exc)
+
+
+def _forget_context(_: BrowserContext) -> None:
+    global _cdp_browser, _context, _page, _session_valid
+    _cdp_browser = None
+    _context = None
+    _page = None
+    _session_valid = False
+
+
+def _on_navigation(frame: Frame) -> None:
+    """Drop the cached session flag as soon as Healthie bounces us to the sign-in page."""
+    global _session_valid
+    if frame.parent_frame is None and "sign_in" in frame.url:
+        _session_valid = False
+
+
+async def _open_context(playwright: Playwright) -> BrowserContext:
+    """Attach to the shared Chromium at HEALTHIE_CDP_URL, or launch the persistent profile.
+
+    The profile directory keeps cookies, the HTTP cache and service workers
+    across process restarts, so the Healthie SPA is not downloaded again on
+    every login. A CDP browser started by scripts/start-chromium.sh goes
+    further and is shared by every process, so none of them pays for a launch.
+    """
+    global _cdp_browser
+
+    if CDP_URL:
+        _cdp_browser = await playwright.chromium.connect_over_cdp(CDP_URL)
+        if _cdp_browser.contexts:
+            return _cdp_browser.contexts[0]
+        return await _cdp_browser.new_context(viewport={"width": 1920, "height": 1080})
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return await playwright.chromium.launch_persistent_context(
+        PROFILE_DIR,
+        headless=HEADLESS,
+        viewport={"width": 1920, "height": 1080},
+        args=BROWSER_ARGS,
+    )
+
+
+async def _open_page() -> Page:
+    """Return the page used for Healthie, starting the browser if needed."""
+    global _context, _playwright
+
+    if _playwright is None:
+        _playwright = await async_playwright().start()
+    if _context is None:
+        _context = await _open_context(_playwright)
+        _context.once("close", _forget_context)
+        await _restore_saved_cookies(_context)
+
+    if _page is not None and not _page.is_closed():
+        page = _page
+    elif _context.pages and _cdp_browser is None:
+        page = _context.pages[0]
+    else:
+        # Pages of a shared CDP browser may belong to other processes, so
+        # open our own
+        page = await _context.new_page()
+    page.set_default_navigation_timeout(DEFAULT_WAIT_TIME)
+    page.set_default_timeout(MAX_WAIT_TIME)
+    page.remove_listener("framenavigated", _on_navigation)
+    page.on("framenavigated", _on_navigation)
+    return page
 
 
 async def login_to_healthie() -> Page:
@@ -46,7 +279,8 @@ async def login_to_healthie() -> Page:
 
     This function handles the login process using credentials from environment
     variables. The browser and page instances are stored for reuse by other
-    functions in this module.
+    functions in this module; an existing session is returned as long as it is
+    still authenticated, and concurrent callers share a single login.
 
     Returns:
         Page: An authenticated Playwright Page instance ready for use.
@@ -55,7 +289,19 @@ async def login_to_healthie() -> Page:
         ValueError: If required environment variables are missing.
         Exception: If login fails for any reason.
     """
-    global _browser, _page, _playwright
+    if _warmup_future is not None and not _warmup_future.done():
+        logger.info("Waiting for the Healthie warm-up to finish")
+        await _warmup_future
+    return await _login()
+
+
+async def _login(revalidate: bool = False) -> Page:
+    """Return the cached page if it is still authenticated, otherwise sign in again.
+
+    With revalidate=True the cached session is not trusted: the sign-in page is
+    loaded again, which only asks for credentials if the server session expired.
+    """
+    global _page, _keepalive_task, _session_valid
 
     email = os.environ.get("HEALTHIE_EMAIL")
     password = os.environ.get("HEALTHIE_PASSWORD")
@@ -65,73 +311,199 @@ async def login_to_healthie() -> Page:
             "HEALTHIE_EMAIL and HEALTHIE_PASSWORD must be set in environment variables"
         )
 
-    # if _page is not None:
-    #     logger.info("Using existing Healthie session")
-    #     return _page
+    async with _login_lock:
+        if not revalidate and _page is not None and not _page.is_closed():
+            if _session_valid or await _session_is_valid(_page):
+                logger.info("Using existing Healthie session")
+                _session_valid = True
+                return _page
 
-    logger.info("Logging into Healthie...")
-    _playwright = await async_playwright().start()
-    _browser = await _playwright.chromium.launch(headless=False)
+        logger.info("Logging into Healthie...")
+        _page = await _open_page()
+        await _sign_in(_page, email, password)
+        _session_valid = True
+        if _context is not None:
+            await _save_storage_state(_context)
 
-    context = await _browser.new_context(viewport={"width": 1920, "height": 1080})
-    _page = await context.new_page()
-    _page.set_default_navigation_timeout(DEFAULT_WAIT_TIME)
+        if _keepalive_task is None or _keepalive_task.done():
+            _keepalive_task = asyncio.create_task(_keep_session_alive())
+
+        logger.info("Successfully logged into Healthie")
+        return _page
 
-    await _page.goto(
-        "https://secure.gethealthie.com/users/sign_in", wait_until="domcontentloaded"
-    )
 
+async def prewarm_healthie() -> None:
+    """Log in and park the page on the Clients view before the first lookup arrives.
+
+    Meant to be scheduled with asyncio.create_task() when the bot starts. It is
+    a no-op once the session is up, so calling it per connection is fine. Errors
+    are logged rather than raised; the first lookup then logs in lazily.
+    """
+    global _warmup_future
+
+    if _warmup_future is not None and not _warmup_future.done():
+        return
+
+    async with _page_lock:
+        # Each bot connection schedules a warm-up; only the first one has work
+        # to do, later ones must not navigate a tab another call may be using.
+        if _session_valid and _page is not None and not _page.is_closed():
+            return
+
+        # Created under the lock: a lookup holding it must never wait on this.
+        # close_healthie_session() may reset the global while this is running.
+        warmup_future = _warmup_future = asyncio.get_running_loop().create_future()
+        try:
+            page = await _login()
+            await page.get_by_role("link", name="Clients").click(timeout=MAX_WAIT_TIME)
+            logger.info("Healthie session warmed up")
+        except Exception as exc:
+            logger.warning("Healthie warm-up failed: {}", exc)
+        finally:
+            warmup_future.set_result(None)
+
+
+async def _sign_in(page: Page, email: str, password: str) -> None:
+    """Drive the Healthie sign-in form, skipping it if the profile's cookies are still valid."""
+    await page.goto(f"{HEALTHIE_URL}/users/sign_in", wait_until="domcontentloaded")
+    if "sign_in" not in page.url and await _session_is_valid(page):
+        logger.info("Restored Healthie session from the persistent profile")
+        return
+
+    # Open the inbox while the form is being filled. get_otp only accepts mail
+    # delivered after it connected, so the password is not submitted until it
+    # is ready; an unread code from an earlier attempt is never picked up.
+    stop_otp_watch = threading.Event()
+    otp_watch_ready = threading.Event()
+
+    def watch_inbox() -> str | None:
+        try:
+            return get_otp(
+                timeout=OTP_TIMEOUT,
+                subject_filter="Sign-in verification code",
+                stop_event=stop_otp_watch,
+                ready_event=otp_watch_ready,
+            )
+        finally:
+            # Never leave the submit step waiting on a watcher that failed
+            otp_watch_ready.set()
+
+    otp_task = asyncio.create_task(asyncio.to_thread(watch_inbox))
+    # The passkeys path never awaits the watcher; don't report its errors as unretrieved.
+    otp_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    try:
+        await _submit_credentials(page, email, password, otp_watch_ready)
+
+        # Healthie either offers to continue past the passkeys prompt or asks
+        # for the emailed code; wait for whichever screen shows up.
+        continue_button = page.locator(SEL_PASSKEYS_CONTINUE)
+        otp_input = page.locator(SEL_OTP_INPUT.format(index=0))
+        await continue_button.or_(otp_input).first.wait_for(
+            state="visible", timeout=OTP_SCREEN_TIMEOUT
+        )
+        if await continue_button.is_visible():
+            await continue_button.click()
+            return
+
+        # -----------------------------------------------------------
+        # If the continue button is not visible, we need to enter the OTP code
+        # -----------------------------------------------------------
+
+        otp_code = await asyncio.wait_for(otp_task, timeout=OTP_TIMEOUT)
+        if otp_code is None:
+            raise Exception("Login failed - the inbox watcher stopped before the OTP arrived")
+        logger.debug("OTP received (len={})", len(otp_code))
+    finally:
+        stop_otp_watch.set()
+
+    try:
+        await page.evaluate(FILL_OTP_SCRIPT, [otp_code, SEL_OTP_INPUT])
+    except PlaywrightError as exc:
+        raise Exception(f"Login failed - could not fill the OTP: {exc}") from exc
+
+    # Healthie submits the code on its own; wait for it to redirect away
+    try:
+        await page.wait_for_url(lambda url: "sign_in" not in url, timeout=MAX_WAIT_TIME)
+    except TimeoutError:
+        raise Exception("Login may have failed - still on sign-in page")
+
+
+async def _submit_credentials(
+    page: Page, email: str, password: str, otp_watch_ready: threading.Event
+) -> None:
+    """Fill in the email and password steps, submitting once the inbox watcher is ready."""
     # Wait for the email input to be visible
-    email_input = _page.locator(
-        'input[name="identifier"], [data-test-id="input-identifier"]'
-    )
-    await email_input.wait_for(state="visible", timeout=30000)
+    email_input = page.locator(SEL_EMAIL_INPUT)
+    await email_input.wait_for(state="visible", timeout=MAX_WAIT_TIME)
     await email_input.fill(email)
 
-    submit_button = _page.locator('button:has-text("Log In")')
-    await submit_button.wait_for(state="visible", timeout=30000)
+    submit_button = page.locator(SEL_LOGIN_BUTTON)
+    await submit_button.wait_for(state="visible", timeout=MAX_WAIT_TIME)
     await submit_button.click()
 
     # Wait for password input
-    password_input = _page.locator('input[name="password"]')
-    await password_input.wait_for(state="visible", timeout=30000)
+    password_input = page.locator(SEL_PASSWORD_INPUT)
+    await password_input.wait_for(state="visible", timeout=MAX_WAIT_TIME)
     await password_input.fill(password)
 
+    await asyncio.to_thread(otp_watch_ready.wait, OTP_TIMEOUT)
+
     # Find and click the Log In button
-    submit_button = _page.locator('button:has-text("Log In")')
-    await submit_button.wait_for(state="visible", timeout=30000)
+    submit_button = page.locator(SEL_LOGIN_BUTTON)
+    await submit_button.wait_for(state="visible", timeout=MAX_WAIT_TIME)
     await submit_button.click()
-   
-    continue_button = _page.locator("[data-test-id=\"passkeys-continue-to-app\"]")
-    await continue_button.wait_for(state="visible", timeout=3000)
-    if await continue_button.is_visible():
-        await continue_button.click()
-        return _page
 
 
-    # -----------------------------------------------------------
-    # If the continue button is not visible, we need to enter the OTP code
-    # -----------------------------------------------------------
-    
-    await asyncio.sleep(10)
-    otp_code = get_otp(subject_filter="Sign-in verification code")
-    logger.info(f"OTP: {otp_code}")
+def _patient_cache_key(name: str, date_of_birth: str) -> tuple[str, str]:
+    """Normalize a (name, DOB) pair so equivalent lookups share a cache entry."""
+    try:
+        dob = parse_flexible_date(date_of_birth).strftime("%Y-%m-%d")
+    except ValueError:
+        dob = date_of_birth.strip().lower()
+    return name.strip().lower(), dob
 
-    for i, digit in enumerate(otp_code):
-        await _page.locator(f'div[data-test-id="otc-input-{i}"] input').fill(digit)
 
-    # Check if we've navigated away from the sign-in page
-    current_url = _page.url
-    if "sign_in" in current_url:
-        raise Exception("Login may have failed - still on sign-in page")
+def _get_cached_patient(key: tuple[str, str]) -> dict | None:
+    """Return a cached lookup if it is still within PATIENT_CACHE_TTL, dropping it otherwise."""
+    cached = _patient_cache.get(key)
+    if cached is None:
+        return None
+    if time.monotonic() - cached[0] < PATIENT_CACHE_TTL:
+        return cached[1]
+    # Expired patient records are removed rather than kept around in memory
+    del _patient_cache[key]
+    return None
+
 
-    logger.info("Successfully logged into Healthie")
-    return _page
+def _cache_patient(key: tuple[str, str], patient: dict) -> None:
+    """Store a lookup, sweeping expired entries and capping the cache size."""
+    now = time.monotonic()
+    for cached_key, (cached_at, _) in list(_patient_cache.items()):
+        if now - cached_at >= PATIENT_CACHE_TTL:
+            del _patient_cache[cached_key]
+    _patient_cache.pop(key, None)
+    _patient_cache[key] = (now, patient)
+    # Entries are kept in insertion order, so the first one is the oldest
+    while len(_patient_cache) > PATIENT_CACHE_MAX_ENTRIES:
+        del _patient_cache[next(iter(_patient_cache))]
+
+
+def _invalidate_patient_cache(patient_id: str) -> None:
+    """Drop cached lookups for a patient whose record has just changed."""
+    for key, (_, patient) in list(_patient_cache.items()):
+        if patient.get("patient_id") == patient_id:
+            del _patient_cache[key]
 
 
 async def find_patient(name: str, date_of_birth: str) -> dict | None:
     """Find a patient in Healthie by name and date of birth.
 
+    Successful lookups are cached for PATIENT_CACHE_TTL seconds, so repeated
+    lookups of the same patient within a session skip the UI scrape. Cache
+    misses are handed to a single lookup worker, so concurrent lookups of the
+    same patient are served by one scrape.
+
     Args:
         name: The patient's full name.
         date_of_birth: The patient's date of birth in a format that Healthie accepts.
@@ -154,83 +526,182 @@ async def find_patient(name: str, date_of_birth: str) -> dict | None:
             "client_since": "2026-01-01",
         }
     """
+    cached = _get_cached_patient(_patient_cache_key(name, date_of_birth))
+    if cached is not None:
+        logger.info("Returning cached data for {}", name)
+        return cached
+
+    future = asyncio.get_running_loop().create_future()
+    await _ensure_lookup_worker().put((name, date_of_birth, future))
+    return await future
+
+
+def _ensure_lookup_worker() -> asyncio.Queue:
+    """Start the lookup worker on first use and return its request channel."""
+    global _lookup_channel, _lookup_worker
+
+    if _lookup_channel is None or _lookup_worker is None or _lookup_worker.done():
+        _lookup_channel = asyncio.Queue()
+        _lookup_worker = asyncio.create_task(_run_lookup_worker(_lookup_channel))
+    return _lookup_channel
+
+
+async def _run_lookup_worker(
+    channel: asyncio.Queue[tuple[str, str, asyncio.Future]],
+) -> None:
+    """Serve queued lookups one patient at a time, scraping each patient once.
+
+    The worker starts on a lookup as soon as it arrives and only batches what
+    is already queued; lookups that pile up behind a running scrape of the
+    same patient are then answered from the cache it filled. Access to the
+    shared tab itself is serialized by _page_lock, which _search_patient takes
+    like every other call that drives the page.
+    """
+    batch: list[tuple[str, str, asyncio.Future]] = []
+    try:
+        while True:
+            batch = [await channel.get()]
+            while len(batch) < LOOKUP_BATCH_SIZE and not channel.empty():
+                batch.append(channel.get_nowait())
+
+            waiters: dict[tuple[str, str], list[tuple[str, str, asyncio.Future]]] = {}
+            for request in batch:
+                waiters.setdefault(_patient_cache_key(request[0], request[1]), []).append(request)
+
+            for key, requests in waiters.items():
+                name, date_of_birth, _ = requests[0]
+                try:
+                    user_data = _get_cached_patient(key)
+                    if user_data is None:
+                        user_data = await _search_patient(name, date_of_birth)
+                        if user_data is not None:
+                            _cache_patient(key, user_data)
+                except Exception as exc:
+                    for *_, future in requests:
+                        if not future.done():
+                            future.set_exception(exc)
+                    continue
+
+                for *_, future in requests:
+                    if not future.done():
+                        future.set_result(user_data)
+    finally:
+        # Don't leave callers waiting on a worker that is shutting down
+        while not channel.empty():
+            batch.append(channel.get_nowait())
+        for *_, future in batch:
+            if not future.done():
+                future.cancel()
+
+
+async def _search_patient(name: str, date_of_birth: str) -> dict | None:
+    """Scrape the Healthie Clients page for a patient; see find_patient."""
+    async with _page_lock:
+        return await _scrape_patient(name, date_of_birth)
+
+
+async def _scrape_patient(name: str, date_of_birth: str, retry: bool = True) -> dict | None:
+    """Run the Clients page search for _search_patient, which holds the page lock.
+
+    A timeout usually means the server-side session expired behind the cached
+    page, so the session is revalidated and the lookup retried once.
+    """
     page = await login_to_healthie()
-    logger.info(f"Searching Healthie for {name} (DOB: {date_of_birth})")
+    logger.info("Searching Healthie for {}", name)
 
     try:
 
         # -----------------------------------------
-        # Navigate to the Clients page
+        # Navigate to the Clients page, unless we are already there
         # -----------------------------------------
-        clients_link = page.get_by_role("link", name="Clients")
-        await clients_link.wait_for(state="visible", timeout=MAX_WAIT_TIME)
-        await clients_link.click()
+        on_clients_page = urlparse(page.url).path.rstrip("/").endswith("/clients")
+        if not on_clients_page:
+            await page.get_by_role("link", name="Clients").click()
 
         # -----------------------------------------
         # Search for the patient
         # -----------------------------------------
         search_input = await _wait_for_test_id(page, "search-input")
+        no_results_text = page.get_by_text(NO_RESULTS_TEXT, exact=False)
+        # A message left over from the previous search would satisfy the
+        # results race below at once, so remember it and wait for it to go
+        stale_message = None
+        if on_clients_page and await no_results_text.first.is_visible():
+            stale_message = await no_results_text.first.element_handle()
         await search_input.fill(name)
         await search_input.press("Enter")
-        await page.wait_for_timeout(3000)
+        if stale_message is not None:
+            try:
+                await stale_message.wait_for_element_state(
+                    "hidden", timeout=SEARCH_REFRESH_TIMEOUT
+                )
+            except TimeoutError:
+                pass  # Healthie kept the same node: this search found nothing either
+            finally:
+                await stale_message.dispose()
 
         # -----------------------------------------
         # Patient found or return None if not found
         # -----------------------------------------
-        no_results_text = page.get_by_text("No results match your search", exact=False)
+        results_container = page.locator(SEL_RESULTS_CONTAINER)
+        all_rows = results_container.get_by_test_id("user-row")
+        # The unfiltered list or a previous search can still be on screen while
+        # the new results load, so a row containing every word of the name is
+        # what marks the results as refreshed.
+        user_rows = all_rows
+        for name_part in name.split():
+            user_rows = user_rows.filter(has_text=name_part)
         try:
-            await no_results_text.wait_for(state="visible", timeout=2000)
-            logger.info(f"No results message displayed for {name}")
-            return None
-        except TimeoutError:
-            pass
-
-        # -----------------------------------------
-        # Table of patients found
-        # -----------------------------------------
-        results_container = page.locator("#quick-profile-user-list-target")
-        try:
-            await results_container.wait_for(state="visible")
-            await results_container.locator("table").wait_for(
+            # Resolves as soon as either a matching row or the message shows
+            await user_rows.first.or_(no_results_text).first.wait_for(
                 state="visible", timeout=MAX_WAIT_TIME
             )
         except TimeoutError:
-            logger.warning(
-                f"Results container did not become visible for {name}. Assuming no matches.",
-            )
+            # The record may spell the name differently (e.g. a middle initial);
+            # fall back to the first search result, as before
+            user_rows = all_rows
+            if await user_rows.count() == 0:
+                logger.warning(
+                    "Results container did not become visible for {}. Assuming no matches.",
+                    name,
+                )
+                return None
+            logger.warning("No result contains every part of {}; using the first result", name)
+
+        # is_visible() is False when nothing matches, so no count() is needed
+        if await no_results_text.first.is_visible():
+            logger.info("No results message displayed for {}", name)
             return None
 
         # -----------------------------------------
         # Get the number of users found
         # -----------------------------------------
-        user_rows = results_container.get_by_test_id("user-row")
         num_user_rows = await user_rows.count()
-        logger.info(f"User rows found for {name}: {num_user_rows}")
+        logger.info("User rows found for {}: {}", name, num_user_rows)
 
         if num_user_rows == 0:
-            logger.error(f"No matching patient rows found for {name}.")
+            logger.error("No matching patient rows found for {}.", name)
             return None
 
         if num_user_rows > 1:
             logger.warning(
-                f"Multiple ({num_user_rows}) patients found for {name}; using the first result"
+                "Multiple ({}) patients found for {}; using the first result",
+                num_user_rows,
+                name,
             )
 
         # -----------------------------------------
         # Click on the first user row
         # -----------------------------------------
-        first_user_row = user_rows.nth(0)
-        await first_user_row.wait_for(state="visible", timeout=MAX_WAIT_TIME)
-
-        first_user_link = first_user_row.get_by_test_id("client-link")
-        await first_user_link.wait_for(state="visible", timeout=MAX_WAIT_TIME)
+        # click() already waits for the link to be actionable
+        first_user_link = user_rows.nth(0).get_by_test_id("client-link")
         await first_user_link.click()
-        await page.wait_for_timeout(1500)
 
         # -----------------------------------------
         # Open the basic information section
         # -----------------------------------------
         section = page.get_by_test_id("cp-section-basic-information")
+        await section.wait_for(state="visible", timeout=MAX_WAIT_TIME)
         await ensure_section_open(section)
 
         basic_info = page.get_by_test_id("client-basic-info")
@@ -240,21 +711,34 @@ async def find_patient(name: str, date_of_birth: str) -> dict | None:
         # Extract the basic information
         # -----------------------------------------
 
-        user_unique_id = await get_text(basic_info, "unique-client-id")
-        client_since = await get_text(basic_info, "client-since")
-        date_of_birth_extracted = await get_text(basic_info, "client-dob")
-        phone_number = await get_value_by_label(basic_info, "Phone number")
-        group = await get_value_by_label(basic_info, "Group")
-        timezone = await get_value_by_label(basic_info, "Timezone")
-        location = await get_value_by_label(basic_info, "Location")
-        last_fitbit_sync = await get_value_by_label(basic_info, "Last Fitbit sync")
-
-        email_element = page.locator(".sidebar-email")
-        email = (await email_element.text_content() or "").strip()
+        fields = await basic_info.evaluate(BASIC_INFO_SCRIPT, SEL_SIDEBAR_EMAIL)
+        user_unique_id = fields["unique_id"]
+        client_since = fields["client_since"]
+        date_of_birth_extracted = fields["dob"]
+        phone_number = fields["phone"]
+        group = fields["group"]
+        timezone = fields["timezone"]
+        location = fields["location"]
+        last_fitbit_sync = fields["fitbit"]
+        email = (fields["email"] or "").strip()
+    except TimeoutError as exc:
+        if not retry:
+            logger.exception("Failed to retrieve patient {} from Healthie: {}", name, exc)
+            return None
+        logger.warning("Healthie lookup for {} timed out; revalidating the session", name)
+        await _login(revalidate=True)
+        return await _scrape_patient(name, date_of_birth, retry=False)
     except Exception as exc:
-        logger.exception(f"Failed to retrieve patient {name} from Healthie: {exc}")
+        logger.exception("Failed to retrieve patient {} from Healthie: {}", name, exc)
         return None
 
+    if not user_unique_id:
+        logger.error("Opened a profile for {} without a unique client ID", name)
+        return None
+
+    # Leave the profile open so a following create_appointment can skip the search
+    _last_opened_patient[user_unique_id] = (time.monotonic(), page.url)
+
     user_data = {
         "patient_id": user_unique_id,
         "name": name,
@@ -270,11 +754,38 @@ async def find_patient(name: str, date_of_birth: str) -> dict | None:
         "client_since": client_since,
     }
 
-    logger.info(f"Returning data for client {name} (ID {user_unique_id})")
-    logger.info(user_data)
+    logger.info("Returning data for client {} (ID {})", name, user_unique_id)
     return user_data
 
 
+def _is_create_appointment_response(response: Response) -> bool:
+    """Match the network response for the appointment form submission."""
+    request = response.request
+    if request.method != "POST":
+        return False
+    if "/api/v1/appointments" in response.url:
+        return True
+    return "graphql" in response.url and "createAppointment" in (request.post_data or "")
+
+
+def _extract_appointment_id(payload: object) -> str | None:
+    """Read the new appointment's id from a REST or GraphQL create response.
+
+    Returns None for any payload shape it does not recognise; the id is a
+    nice-to-have and must not turn a created appointment into a failure.
+    """
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        data = payload
+    created = data.get("createAppointment")
+    if isinstance(created, dict) and isinstance(created.get("appointment"), dict):
+        data = created["appointment"]
+    appointment_id = data.get("id")
+    return str(appointment_id) if appointment_id is not None else None
+
+
 async def create_appointment(
     patient_id: str, date_str: str, time_str: str
 ) -> dict | None:
@@ -299,6 +810,14 @@ async def create_appointment(
             ...
         }
     """
+    async with _page_lock:
+        return await _create_appointment(patient_id, date_str, time_str)
+
+
+async def _create_appointment(
+    patient_id: str, date_str: str, time_str: str
+) -> dict | None:
+    """Book the appointment for create_appointment, which holds the page lock."""
 
     # 1. Ensure you're logged in by calling login_to_healthie()
     # 2. Navigate to the appointment creation page for the patient
@@ -312,16 +831,19 @@ async def create_appointment(
 
     try:
         # -----------------------------------------
-        # Search for the patient profile
+        # Search for the patient profile, unless find_patient just opened it
         # -----------------------------------------
-        search_input = await _wait_for_test_id(_page, "header-client-search-form")
-        await search_input.fill(patient_id)
-        await search_input.press("Enter")
-        await _page.wait_for_timeout(3000)
+        opened_at, profile_url = _last_opened_patient.pop(patient_id, (0.0, ""))
+        if time.monotonic() - opened_at < OPENED_PROFILE_TTL and _page.url == profile_url:
+            logger.info("Reusing the open profile for patient {}", patient_id)
+        else:
+            search_input = await _wait_for_test_id(_page, "header-client-search-form")
+            await search_input.fill(patient_id)
+            await search_input.press("Enter")
 
-        view_profile = await _wait_for_test_id(_page, "view-profile")
-        await view_profile.wait_for(state="visible")
-        await view_profile.click()
+            view_profile = await _wait_for_test_id(_page, "view-profile")
+            await view_profile.wait_for(state="visible")
+            await view_profile.click()
 
         # -----------------------------------------
         # Open the Create Appointment
@@ -332,17 +854,13 @@ async def create_appointment(
         await add_appointment_button.wait_for(state="visible")
         await add_appointment_button.click()
 
-        appointment_modal = _page.locator(
-            "div._asideModalBody_bk67x_39, div[data-test-id='appointment-modal-body']"
-        )
+        appointment_modal = _page.locator(SEL_APPOINTMENT_MODAL)
         await appointment_modal.wait_for(state="visible")
 
         # -----------------------------------------
         # Validate if the appointment is in the past
         # -----------------------------------------
-        await _page.locator(
-            ".appointment_type_id > .css-1wpuca6-control > .css-cjz6q7 > .css-qc71lm"
-        ).click()
+        await _page.locator(SEL_APPT_TYPE_DROPDOWN).click()
         await _page.get_by_text("Initial Consultation - 60 Minutes", exact=True).click()
 
         # -----------------------------------------
@@ -359,57 +877,73 @@ async def create_appointment(
         # -----------------------------------------
         # Select the appointment time
         # -----------------------------------------
-        await _page.get_by_placeholder("Select a time").click()
-        time_picker = _page.locator(
-            "li.react-datepicker__time-list-item", has_text=time_str
-        )
+        time_input = _page.get_by_placeholder("Select a time")
+        await time_input.click()
+        time_picker = _page.locator(SEL_TIME_LIST_ITEM, has_text=time_str)
         await time_picker.wait_for(state="visible")
         await time_picker.click()
-        await _page.wait_for_timeout(1000)
+        await expect(time_input).not_to_have_value("")
 
-        await _page.get_by_role("textbox", name="Start date*").click()
+        # Type the date straight into the picker; only walk the calendar month
+        # by month if the widget rejects typed input.
+        start_date = _page.get_by_role("textbox", name="Start date*")
+        original_start_date = await start_date.input_value()
+        typed_date = appointment_datetime.strftime(DATE_PICKER_INPUT_FORMAT)
+        await start_date.fill(typed_date)
+        await start_date.press("Enter")
 
-        total_months = calculate_diff_months(now, appointment_datetime)
-        for _ in range(total_months):
-            await _page.get_by_test_id("next-month").click()
+        if await start_date.input_value() != typed_date:
+            logger.info("Start date input rejected typed date; using the calendar")
+            await start_date.fill(original_start_date)
+            await start_date.click()
 
-        await _page.get_by_role(
-            "button", name=f"Choose {format_target_date(date_str, time_str)}"
-        ).click()
+            total_months = calculate_diff_months(now, appointment_datetime)
+            for _ in range(total_months):
+                await _page.get_by_test_id("next-month").click()
+
+            await _page.get_by_role(
+                "button", name=f"Choose {format_target_date(date_str, time_str)}"
+            ).click()
 
         # -------------------------------------------------------------
         # Verify if there is no another event scheduled at this time or return None
         # -------------------------------------------------------------
-        flash = _page.locator("div.flash-message")
-
-        await asyncio.sleep(1)
         flash = _page.get_by_test_id("appointment-form-modal").get_by_test_id(
             "flash-message"
         )
-        if await flash.is_visible():
-            intent = await flash.inner_text()
-            logger.info(f"Intent: {str(intent)}")
-            if intent == "You have another event scheduled at this time":
+        try:
+            await flash.wait_for(state="visible", timeout=FLASH_MESSAGE_TIMEOUT)
+            intent = (await flash.inner_text()).strip()
+            logger.info("Intent: {}", intent)
+            if CONFLICT_RE.search(intent):
                 logger.info("Another event scheduled at this time")
                 return None
+        except TimeoutError:
+            pass
 
         # -----------------------------------------
         # Create the appointment
         # -----------------------------------------
-        await _page.get_by_test_id("appointment-form-modal").get_by_test_id(
-            "primaryButton"
-        ).click()
+        appointment_form = _page.get_by_test_id("appointment-form-modal")
+        appointment_id = None
+        try:
+            async with _page.expect_response(
+                _is_create_appointment_response, timeout=DEFAULT_WAIT_TIME
+            ) as response_info:
+                await appointment_form.get_by_test_id("primaryButton").click()
+            response = await response_info.value
+            if response.ok:
+                appointment_id = _extract_appointment_id(await response.json())
+        except (PlaywrightError, ValueError) as exc:
+            # TimeoutError is a PlaywrightError; so is json() on a non-JSON body
+            logger.warning("Could not read the create appointment response: {}", exc)
+        await appointment_form.wait_for(state="hidden", timeout=MAX_WAIT_TIME)
 
         # -----------------------------------------
         # Verify appointment was created successfully
         # -----------------------------------------
-        # reload the appointments list
-        await asyncio.sleep(0.5)
-        await _page.get_by_test_id("tab-past").click()
-        await asyncio.sleep(0.5)
-        await _page.get_by_test_id("tab-future").click()
-        await asyncio.sleep(2)
-
+        # The submit response usually refreshes the appointments list; if it
+        # does not, toggling the past/future tabs reloads it.
         appointments_list = _page.get_by_test_id(
             "cop-appointments-section"
         ).get_by_test_id("collapsible-section-body")
@@ -418,24 +952,42 @@ async def create_appointment(
 
         data_label = format_appointment_label(appointment_datetime)
         appointment_found = appointments_list.get_by_text(data_label, exact=False)
-        if await appointment_found.is_visible():
-            logger.info("Appointment found at this time")
-            await appointment_found.click()
-            await asyncio.sleep(5)
-        else:
-            logger.info(f"No appointment found at this time: {data_label}")
-            return None
+        try:
+            await appointment_found.wait_for(state="visible", timeout=DEFAULT_WAIT_TIME)
+        except TimeoutError:
+            logger.info("Appointments list did not refresh; reloading it")
+            await _page.get_by_test_id("tab-past").click()
+            await _page.get_by_test_id("tab-future").click()
+            try:
+                await appointment_found.wait_for(state="visible", timeout=DEFAULT_WAIT_TIME)
+            except TimeoutError:
+                if appointment_id is None:
+                    logger.info("No appointment found at this time: {}", data_label)
+                    return None
+                # Healthie confirmed the booking; reporting a failure would
+                # make the agent book the slot a second time
+                logger.warning(
+                    "Appointment {} created but not listed yet; returning it without a link",
+                    appointment_id,
+                )
+                appointment_found = None
 
         # -----------------------------------------
         # Extract appointment data
         # -----------------------------------------
-        link = _page.get_by_role("link", name="Healthie video call")
-        meeting_link = await link.get_attribute("href")
-        meeting_link = "https://secure.gethealthie.com/" + meeting_link
-        logger.info(f"Link: {meeting_link}")
+        meeting_link = None
+        if appointment_found is not None:
+            logger.info("Appointment found at this time")
+            await appointment_found.click()
+            link = _page.get_by_role("link", name="Healthie video call")
+            await link.wait_for(state="visible", timeout=MAX_WAIT_TIME)
+            meeting_link = await link.get_attribute("href")
+            meeting_link = "https://secure.gethealthie.com/" + meeting_link
+            logger.info("Link: {}", meeting_link)
 
 
         appointment_data = {
+            "appointment_id": appointment_id,
             "patient_phone": "phone_text",
             "meeting_link": meeting_link,
             "consultation_type": "Initial Consultation",
@@ -445,24 +997,54 @@ async def create_appointment(
             "appointment_date": date_str,
             "appointment_time": time_str,
         }
-        logger.info(f"Created appointment data: {appointment_data}")
+        logger.info("Created appointment data: {}", appointment_data)
+        _invalidate_patient_cache(patient_id)
         return appointment_data
 
     except Exception as exc:
-        logger.exception(f"Failed to search for patient {patient_id}: {exc}")
+        logger.exception("Failed to search for patient {}: {}", patient_id, exc)
         return None
 
 
-async def close_healthie_session() -> None:
-    """Clean up any Playwright resources associated with the Healthie session."""
-    global _browser, _page, _playwright
+async def _disconnect_cdp_browser(browser: Browser, page: Page | None) -> None:
+    """Close our tab in the shared browser, then disconnect and leave it running."""
+    try:
+        if page is not None and not page.is_closed():
+            await page.close()
+    finally:
+        await browser.close()
 
-    if _browser is not None:
-        await _browser.close()
-        _browser = None
 
-    if _playwright is not None:
-        await _playwright.stop()
-        _playwright = None
+async def close_healthie_session() -> None:
+    """Clean up any Playwright resources associated with the Healthie session.
 
-    _page = None
+    Safe to call more than once, including while an earlier call is still
+    shutting down: the module state is cleared before anything is awaited.
+    """
+    global _cdp_browser, _context, _page, _playwright, _keepalive_task, _warmup_future
+    global _session_valid, _lookup_channel, _lookup_worker
+
+    cdp_browser, context, page, playwright = _cdp_browser, _context, _page, _playwright
+    tasks = [task for task in (_keepalive_task, _lookup_worker) if task is not None]
+
+    _cdp_browser = _context = _page = _playwright = None
+    _keepalive_task = _lookup_worker = _lookup_channel = _warmup_future = None
+    _session_valid = False
+    _last_opened_patient.clear()
+    _patient_cache.clear()
+
+    for task in tasks:
+        task.cancel()
+    pending: list[Awaitable[object]] = [*tasks]
+    if cdp_browser is not None:
+        pending.append(_disconnect_cdp_browser(cdp_browser, page))
+    elif context is not None:
+        pending.append(context.close())
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    # The driver must outlive the context it is closing, so stop it last
+    if playwright is not None:
+        try:
+            await playwright.stop()
+        except Exception as exc:
+            logger.warning("Failed to stop Playwright cleanly: {}", exc)
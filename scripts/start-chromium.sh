@@ -0,0 +1,13 @@
+#!/usr/bin/env sh
+# Start a long-lived Chromium that the Healthie integration can share over CDP.
+# Point the bot or the tests at it with HEALTHIE_CDP_URL=http://localhost:9222
+CHROMIUM="${CHROMIUM:-chromium}"
+PORT="${CDP_PORT:-9222}"
+
+exec "$CHROMIUM" \
+    --remote-debugging-port="$PORT" \
+    --user-data-dir=./.chromium-profile \
+    --blink-settings=imagesEnabled=false \
+    --disable-dev-shm-usage \
+    --disable-gpu \
+    "$@"
@@ -7,6 +7,14 @@ import os
 import pytest
 from dotenv import load_dotenv
 
+import integration.healthie as healthie
+
+# Chromium locks its user-data-dir, so each pytest-xdist worker gets its own
+# profile. The saved storage state stays shared so workers can reuse a login.
+_xdist_worker = os.environ.get("PYTEST_XDIST_WORKER")
+if _xdist_worker:
+    healthie.PROFILE_DIR = f"{healthie.PROFILE_DIR}-{_xdist_worker}"
+
 @pytest.fixture(scope="session", autouse=True)
 def load_env():
     """Load the environment variables."""
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from utils.date_helpers import parse_flexible_date
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2003-08-28",
+        "2003-8-28",
+        " 2003-08-28 ",
+        "Aug 28, 2003",
+        "August 28, 2003",
+    ],
+)
+def test_parse_flexible_date_accepts_supported_formats(value):
+    """Padded, unpadded and month-name dates all parse to the same day."""
+    assert parse_flexible_date(value) == datetime(2003, 8, 28)
+
+
+@pytest.mark.parametrize("value", ["2003-13-28", "28/08/2003", ""])
+def test_parse_flexible_date_rejects_unsupported_input(value):
+    """Invalid or unsupported dates raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_flexible_date(value)
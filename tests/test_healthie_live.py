@@ -21,15 +21,23 @@ LIVE_CLIENT_SINCE = "Feb 24, 2026"
 LIVE_PATIENT_ID = "13632871"
 
 
-@pytest_asyncio.fixture(scope="function")
-async def authenticated_healthie_session():
-    """Authenticate the Healthie session."""
+@pytest_asyncio.fixture(scope="session")
+async def healthie_browser_session():
+    """Launch the browser and log into Healthie once for the whole test session."""
     _ensure_credentials()
-    page = await healthie.login_to_healthie()
-    yield page
+    await healthie.login_to_healthie()
+    yield
     await healthie.close_healthie_session()
 
 
+@pytest_asyncio.fixture(scope="function")
+async def authenticated_healthie_session(healthie_browser_session):
+    """Hand each test the shared authenticated page with no cached lookups."""
+    healthie._patient_cache.clear()
+    healthie._last_opened_patient.clear()
+    yield await healthie.login_to_healthie()
+
+
 @pytest.mark.asyncio
 @pytest.mark.live
 async def test_find_patient_live_returns_expected(authenticated_healthie_session):
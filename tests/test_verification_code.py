@@ -1,19 +1,95 @@
 import os
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 
 import pytest
 import pytest_asyncio
 
-from utils.get_verification_code import get_otp
+from utils.get_verification_code import (
+    _message_from_fetch,
+    extract_otp_from_message,
+    get_otp,
+)
 
 
 
 @pytest.mark.asyncio
 @pytest.mark.live
-async def test_find_patient_live_returns_expected():
-    """Validate that find_patient() returns the expected fields for a known client."""
-    otp_code = get_otp(subject_filter="Sign-in verification code")
+async def test_get_otp_live_returns_six_digit_code():
+    """Validate that get_otp() reads a 6-digit sign-in code from the inbox."""
+    otp_code = get_otp(subject_filter="Sign-in verification code", new_only=False)
     assert otp_code is not None, "Expected to get an OTP code"
     assert len(otp_code) == 6, "Expected an OTP code of 6 digits"
     print(otp_code)
     print("OTP code received")
 
+
+
+def _multipart(*parts):
+    msg = MIMEMultipart("alternative")
+    for part in parts:
+        msg.attach(part)
+    return msg
+
+
+def _fetch_response(msg):
+    """Split a message the way IMAP returns FETCH_PARTS: header fields, then body."""
+    raw = msg.as_bytes()
+    headers, body = raw.split(b"\n\n", 1)
+    return [
+        (b"1 (UID 7 BODY[HEADER.FIELDS (MIME-VERSION CONTENT-TYPE)] {0}", headers + b"\r\n\r\n"),
+        (b" BODY[TEXT] {0}", body),
+        b")",
+    ]
+
+
+def test_extract_otp_from_plain_message():
+    """A single-part text/plain mail yields the 6-digit code."""
+    msg = MIMEText("Your sign-in verification code is 482913.", "plain")
+    assert extract_otp_from_message(msg) == "482913"
+
+
+def test_extract_otp_from_html_message():
+    """An html-only mail yields the code from its <h2>, not a css colour."""
+    html = '<style>p { color: #123456; }</style><h2 class="code"> 482913 </h2>'
+    msg = _multipart(MIMEText(html, "html"))
+    assert extract_otp_from_message(msg) == "482913"
+
+
+def test_extract_otp_prefers_plain_part_of_multipart_message():
+    """The plain part is searched before the html alternative."""
+    msg = _multipart(
+        MIMEText("Your code is 482913.", "plain"),
+        MIMEText("<h2>111111</h2>", "html"),
+    )
+    assert extract_otp_from_message(msg) == "482913"
+
+
+def test_extract_otp_skips_attachments():
+    """Digits in an attachment are never mistaken for the code."""
+    msg = MIMEMultipart("mixed")
+    attachment = MIMEText("Invoice 999999", "plain")
+    attachment.add_header("Content-Disposition", "attachment", filename="invoice.txt")
+    msg.attach(attachment)
+    msg.attach(MIMEText("<h2>482913</h2>", "html"))
+    assert extract_otp_from_message(msg) == "482913"
+
+
+def test_extract_otp_returns_none_without_code():
+    """A mail without a 6-digit code yields None."""
+    assert extract_otp_from_message(MIMEText("No code here.", "plain")) is None
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_message_from_fetch_accepts_items_in_any_order(reverse):
+    """The header and body items are matched by name, not by position."""
+    msg = _multipart(
+        MIMEText("Your code is 482913.", "plain"),
+        MIMEText("<h2>482913</h2>", "html"),
+    )
+    msg_data = _fetch_response(msg)
+    if reverse:
+        msg_data = [msg_data[1], msg_data[0], msg_data[2]]
+    rebuilt = _message_from_fetch(msg_data)
+    assert rebuilt.is_multipart()
+    assert extract_otp_from_message(rebuilt) == "482913"
@@ -1,6 +1,53 @@
+import re
 from datetime import datetime
+from functools import lru_cache
 
+DATE_INPUT_FORMATS = ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y")
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Day of month -> ordinal string, e.g. 1 -> '1st', 12 -> '12th', 23 -> '23rd'
+_ORDINAL_SUFFIXES = {1: "st", 2: "nd", 3: "rd"}
+_DAY_SUFFIX = {
+    day: f"{day}{'th' if 11 <= day <= 13 else _ORDINAL_SUFFIXES.get(day % 10, 'th')}"
+    for day in range(1, 32)
+}
 
+
+@lru_cache(maxsize=512)
+def _parse_flexible_date_cached(trimmed: str) -> datetime:
+    last_error: Exception | None = None
+    # ISO dates skip strptime entirely; fromisoformat is implemented in C.
+    if _ISO_DATE_RE.fullmatch(trimmed):
+        try:
+            return datetime.fromisoformat(trimmed)
+        except ValueError as exc:  # noqa: BLE001
+            last_error = exc
+
+    # strptime still covers the unpadded ISO form, e.g. '2003-8-28'
+    strptime = datetime.strptime
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return strptime(trimmed, fmt)
+        except ValueError as exc:  # noqa: BLE001
+            last_error = exc
+    raise ValueError(
+        f"Date '{trimmed}' must match one of the formats: {', '.join(DATE_INPUT_FORMATS)}"
+    ) from last_error
+
+
+def parse_flexible_date(value: str) -> datetime:
+    """
+    Parse a date given in any of the DATE_INPUT_FORMATS.
+    Args:
+        value: str: 'YYYY-MM-DD', 'Aug 28, 2003' or 'August 28, 2003'
+    Returns:
+        datetime: The parsed date.
+    Raises:
+        ValueError: If the date does not match any supported format.
+    """
+    return _parse_flexible_date_cached(value.strip())
+
+
+@lru_cache(maxsize=256)
 def convert_to_datetime(date: str, time: str) -> datetime:
     """
     Convert a date and time string to a datetime object.
@@ -21,21 +68,8 @@ def format_target_date(date, time):
     Returns:
         str: 'Saturday, February 28th'
     """
-
-    def day_with_suffix(day: int) -> str:
-        if 11 <= day <= 13:
-            return f"{day}th"
-        last_digit = day % 10
-        if last_digit == 1:
-            return f"{day}st"
-        elif last_digit == 2:
-            return f"{day}nd"
-        elif last_digit == 3:
-            return f"{day}rd"
-        return f"{day}th"
-
     target = convert_to_datetime(date, time)
-    day_str = day_with_suffix(target.day)
+    day_str = _DAY_SUFFIX[target.day]
     formatted = target.strftime(f"%A, %B {day_str}")
     return formatted
 
@@ -14,17 +14,36 @@ IMAP_HOST = "imap.gmail.com"
 EMAIL_ACCOUNT = os.environ.get("MAIL_EMAIL")
 EMAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
 
+# Only the MIME headers needed to split the body into parts, plus the body
+# itself. BODY[...] (not BODY.PEEK) marks the mail as seen, like RFC822 did,
+# so a used code is not picked up again by the UNSEEN search.
+FETCH_PARTS = "(BODY[HEADER.FIELDS (MIME-VERSION CONTENT-TYPE CONTENT-TRANSFER-ENCODING)] BODY[TEXT])"
 
-def _digits_in_text(text):
+# Bytes patterns run on the decoded payload directly, so the body never has to
+# be converted to str. The lookbehind skips #colors in css used to style the text.
+_RE_PLAIN = re.compile(rb"(?<!#)\b(\d{6})\b")
+_RE_H2 = re.compile(rb"<h2[^>]*>\s*(\d{6})\s*</h2>", re.IGNORECASE)
+_RE_TAG = re.compile(rb">\s*(\d{6})\s*<")
+
+
+def _as_bytes(payload):
+    return payload.encode(errors="ignore") if isinstance(payload, str) else payload or b""
+
+
+def _digits_in_text(payload):
     """
-    Extract the OTP code from the text.
+    Extract the OTP code candidates from the text.
     Args:
-        text: The text to extract the OTP code from.
+        payload: The bytes (or text) to extract the OTP code from.
     Returns:
-        The OTP code.
+        The OTP code candidates.
     """
-    # Avoid matching #colors in css because they are used to style the text
-    return re.findall(r"(?<!#)\b\d{6}\b", text or "")
+    return [match.decode() for match in _RE_PLAIN.findall(_as_bytes(payload))]
+
+
+def _search_code(pattern, payload):
+    match = pattern.search(payload)
+    return match.group(1).decode() if match else None
 
 
 def extract_otp_from_message(msg):
@@ -36,31 +55,54 @@ def extract_otp_from_message(msg):
         The OTP code.
     """
     if msg.is_multipart():
+        plain_parts, html_parts = [], []
         for part in msg.walk():
+            if part.get_content_disposition() == "attachment":
+                continue
             content_type = part.get_content_type()
+            if content_type == "text/plain":
+                plain_parts.append(part)
+            elif content_type == "text/html":
+                html_parts.append(part)
+
+        # Payloads are only decoded when searched, so a hit in the plain text
+        # means the (usually much larger) HTML body is never touched.
+        for part in plain_parts:
+            match = _digits_in_text(part.get_payload(decode=True))
+            if match:
+                return match[0]
+        for part in html_parts:
             payload = part.get_payload(decode=True)
             if not payload:
                 continue
-            body = payload.decode(errors="ignore") if isinstance(payload, bytes) else payload
-            if content_type == "text/plain":
-                match = _digits_in_text(body)
-                if match:
-                    return match[0]
-            if content_type == "text/html":
-                match = re.search(r"<h2[^>]*>\s*(\d{6})\s*</h2>", body, re.IGNORECASE)
-                if match:
-                    return match.group(1)
-                match = re.search(r">\s*(\d{6})\s*<", body)
-                if match:
-                    return match.group(1)
+            otp = _search_code(_RE_H2, payload) or _search_code(_RE_TAG, payload)
+            if otp:
+                return otp
     else:
-        payload = msg.get_payload(decode=True)
-        body = payload.decode(errors="ignore") if isinstance(payload, bytes) else payload
-        match = _digits_in_text(body)
+        match = _digits_in_text(msg.get_payload(decode=True))
         if match:
             return match[0]
     return None
 
+def _message_from_fetch(msg_data):
+    """
+    Rebuild a parseable message from a FETCH_PARTS response.
+    Args:
+        msg_data: The data returned by IMAP4.fetch.
+    Returns:
+        The email message.
+    """
+    headers, body = b"", b""
+    for item in msg_data:
+        if not isinstance(item, tuple):
+            continue
+        if b"BODY[TEXT]" in item[0]:
+            body = item[1]
+        else:
+            headers = item[1]
+    return email.message_from_bytes(headers.rstrip(b"\r\n") + b"\r\n\r\n" + body)
+
+
 def print_email_body(msg):
     """
     Print the raw payload body of an email message.
@@ -72,7 +114,44 @@ def print_email_body(msg):
         body = payload
     print("Raw payload body:", body)
 
-def get_otp(timeout=30, sender_filter=None, subject_filter=None, debug=False):
+def _next_uid(mail):
+    """
+    Return the UID the next message delivered to the selected mailbox will get.
+    Args:
+        mail: A logged-in IMAP4 connection with a mailbox selected.
+    """
+    # SELECT usually reports UIDNEXT already; only ask for it if it did not
+    _, data = mail.response("UIDNEXT")
+    if not data or data[0] is None:
+        _, data = mail.status("INBOX", "(UIDNEXT)")
+        data = re.findall(rb"UIDNEXT (\d+)", data[0])
+    return int(data[0])
+
+
+def _wait_for_new_mail(mail, seconds):
+    """
+    Block in IMAP IDLE until the server announces new mail or the time runs out.
+    Args:
+        mail: A logged-in IMAP4 connection with a mailbox selected.
+        seconds: The maximum time to wait.
+    """
+    with mail.idle(duration=seconds) as idler:
+        for response_type, _ in idler:
+            if response_type == "EXISTS":
+                return
+
+
+def get_otp(
+    timeout=30,
+    sender_filter=None,
+    subject_filter=None,
+    debug=False,
+    poll_interval=0.25,
+    max_poll_interval=4.0,
+    stop_event=None,
+    new_only=True,
+    ready_event=None,
+):
     """
     Get the OTP code from the email.
     Args:
@@ -80,17 +159,30 @@ def get_otp(timeout=30, sender_filter=None, subject_filter=None, debug=False):
         sender_filter: The sender of the email.
         subject_filter: The subject of the email.
         debug: Whether to print the email body.
+        poll_interval: The initial delay in seconds between inbox searches.
+        max_poll_interval: The upper bound for the delay, which doubles after each miss.
+        stop_event: Optional threading.Event; setting it abandons the wait.
+        new_only: Only accept mail delivered after the inbox was opened, so a
+            leftover unread code from an earlier attempt is never returned.
+        ready_event: Optional threading.Event, set once the inbox is open and
+            anything delivered from then on will be picked up.
+    When both Python (3.14+) and the server support IMAP IDLE, the inbox is
+    searched again as soon as the server pushes new mail instead of on a timer.
     Returns:
-        The OTP code.
+        The OTP code, or None if stop_event was set before it arrived.
     """
     mail = imaplib.IMAP4_SSL(IMAP_HOST)
     mail.login(EMAIL_ACCOUNT, EMAIL_PASSWORD)
     mail.select("INBOX")
+    use_idle = hasattr(mail, "idle") and "IDLE" in mail.capabilities
+    first_uid = _next_uid(mail) if new_only else 1
+    if ready_event is not None:
+        ready_event.set()
 
     start_time = time.time()
 
     while time.time() - start_time < timeout:
-        criteria = ['UNSEEN']
+        criteria = ['UID', f'{first_uid}:*', 'UNSEEN']
 
         if sender_filter:
             criteria += ['FROM', f'"{sender_filter}"']
@@ -98,18 +190,18 @@ def get_otp(timeout=30, sender_filter=None, subject_filter=None, debug=False):
         if subject_filter:
             criteria += ['SUBJECT', f'"{subject_filter}"']
 
-        status, messages = mail.search(None, *criteria)
+        status, messages = mail.uid("search", *criteria)
 
         if status == "OK":
-            mail_ids = messages[0].split()
+            # "n:*" always matches the newest message, even when its UID is below n
+            mail_ids = [uid for uid in messages[0].split() if int(uid) >= first_uid]
 
             if mail_ids:
                 latest_id = mail_ids[-1]
 
-                status, msg_data = mail.fetch(latest_id, "(RFC822)")
+                status, msg_data = mail.uid("fetch", latest_id, FETCH_PARTS)
                 if status == "OK":
-                    raw_email = msg_data[0][1]
-                    msg = email.message_from_bytes(raw_email)
+                    msg = _message_from_fetch(msg_data)
                     
                     if debug:
                         print_email_body(msg)
@@ -119,7 +211,23 @@ def get_otp(timeout=30, sender_filter=None, subject_filter=None, debug=False):
                         mail.logout()
                         return otp
 
-        time.sleep(0.5)
+        remaining = max(0, timeout - (time.time() - start_time))
+        if use_idle:
+            # Short IDLE rounds so stop_event is still honoured promptly
+            _wait_for_new_mail(mail, min(max_poll_interval, remaining))
+            if stop_event is not None and stop_event.is_set():
+                mail.logout()
+                return None
+            continue
+
+        delay = min(poll_interval, remaining)
+        if stop_event is not None:
+            if stop_event.wait(delay):
+                mail.logout()
+                return None
+        else:
+            time.sleep(delay)
+        poll_interval = min(poll_interval * 2, max_poll_interval)
 
     mail.logout()
     raise TimeoutError("OTP email not received")
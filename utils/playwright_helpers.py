@@ -3,7 +3,7 @@ Playwright helpers.
 """
 from playwright.async_api import Page, Locator
 
-MAX_WAIT_TIME = 30_000
+MAX_WAIT_TIME = 20_000
 
 async def _wait_for_test_id(page: Page, test_id: str) -> Locator:
     """Wait for a control identified by a test ID to be visible before returning it."""
@@ -12,25 +12,15 @@ async def _wait_for_test_id(page: Page, test_id: str) -> Locator:
     return locator
 
 
-async def get_value_by_label(container: Locator, label_text: str) -> str:
-    """Get the value of a label in a container. 
-    Args:
-        container: The container to search for the label.
-        label_text: The text of the label to search for.
+async def ensure_section_open(section: Locator) -> None:
+    """Click to open a collapsible section if not already opened.
 
-    Returns:
-        str: The value of the label.
+    The class check and the click happen in the same round trip.
     """
-
-    row = container.locator("div.row").filter(has_text=label_text)
-    return await row.locator("div").last.inner_text()
-
-async def get_text(element: Locator, test_id: str) -> str | None:
-    """Retrieve inner text from a test_id, safely."""
-    return (await element.get_by_test_id(test_id).inner_text()).strip()
-
-async def ensure_section_open(section: Locator) -> None:
-    """Click to open a collapsible section if not already opened."""
-    classes = (await section.get_attribute("class")) or ""
-    if "opened" not in classes:
-        await section.get_by_role("button").click()
\ No newline at end of file
+    await section.evaluate(
+        """el => {
+            if (!el.classList.contains("opened")) {
+                el.querySelector("button, [role='button']")?.click();
+            }
+        }"""
+    )
\ No newline at end of file